@@ -1,6 +1,6 @@
 # eeprom_test.py  (RPi4 + CPython)
 # Prueba segura para 24C08 (1 KB) con direcciones 0x54..0x57
-# Escribe y lee byte a byte para evitar problemas de página.
+# Escribe por páginas alineadas (sin cruzar límites) y lee en secuencial.
 
 import time
 from smbus2 import SMBus, i2c_msg
@@ -14,6 +14,7 @@ class EEPROM24C08:
         self.size = size                # 1024 bytes
         self.page_size = page_size      # 16 bytes
         self.block_bits = block_bits    # 2 bits -> 4 bloques de 256 B
+        self._poll_msgs = {}            # dev_addr -> "ping" vacío reutilizable
 
     def _dev_addr_for(self, addr):
         block = (addr >> 8) & ((1 << self.block_bits) - 1)  # 0..3
@@ -22,19 +23,23 @@ class EEPROM24C08:
     def _offset_for(self, addr):
         return addr & 0xFF
 
-    def _ack_poll(self, dev_addr, timeout_ms=20):
-        # Espera a que termine el ciclo interno de escritura de la EEPROM
-        t0 = time.time()
-        while (time.time() - t0) * 1000 < timeout_ms:
+    def _ack_poll(self, dev_addr, max_retries=500, timeout_ms=20):
+        # Espera a que termine el ciclo interno de escritura de la EEPROM.
+        # Reintenta un "ping" vacío: un NAK significa "ocupada". Sin sleeps:
+        # la propia transferencia NAK marca el ritmo (~100 µs a 100 kHz).
+        # Límite duro con monotonic_ns (comparación entera, inmune a saltos de reloj).
+        msg = self._poll_msgs.get(dev_addr)
+        if msg is None:
+            # Como mucho 4 entradas (una por bloque 0x54..0x57)
+            msg = self._poll_msgs[dev_addr] = i2c_msg.write(dev_addr, [])
+        deadline = time.monotonic_ns() + timeout_ms * 1_000_000
+        for _ in range(max_retries):
             try:
-                # "ping" con mensaje vacío: algunos controladores aceptan este patrón
-                w = i2c_msg.write(dev_addr, [])
-                self.bus.i2c_rdwr(w)
+                self.bus.i2c_rdwr(msg)
                 return
             except Exception:
-                time.sleep(0.001)
-        # De todas formas, añadimos un pequeño retardo de seguridad
-        time.sleep(0.005)
+                if time.monotonic_ns() >= deadline:
+                    return
 
     def write_byte(self, addr, value):
         if not (0 <= addr < self.size):
@@ -54,18 +59,54 @@ class EEPROM24C08:
         return data[0]
 
     def write_bytes(self, start, data: bytes):
-        # Seguro: byte a byte (más lento, pero sin quebraderos por páginas)
-        for i, b in enumerate(data):
-            self.write_byte(start + i, b)
+        # Por páginas: un transacción + un ack-poll por página, sin cruzar límites
+        addr = start
+        end = start + len(data)
+        if not (0 <= start and end <= self.size):
+            raise ValueError("Rango fuera de la memoria")
+        pos = 0
+        while addr < end:
+            # No cruzar el límite de página (la EEPROM envolvería dentro de la página)
+            chunk_len = min(self.page_size - (addr % self.page_size), end - addr)
+            dev = self._dev_addr_for(addr)
+            off = self._offset_for(addr)
+            self.bus.write_i2c_block_data(dev, off, list(data[pos:pos + chunk_len]))
+            self._ack_poll(dev)
+            addr += chunk_len
+            pos += chunk_len
 
     def read_bytes(self, start, length):
-        return bytes(self.read_byte(start + i) for i in range(length))
+        # Lectura secuencial: fijar la dirección una vez y leer el bloque entero
+        if not (0 <= start and start + length <= self.size):
+            raise ValueError("Rango fuera de la memoria")
+        buf = bytearray(length)
+        addr = start
+        pos = 0
+        try:
+            while pos < length:
+                dev = self._dev_addr_for(addr)
+                off = self._offset_for(addr)
+                # No cruzar el límite de 256 B (cambia la dirección de dispositivo)
+                chunk_len = min(0x100 - (addr & 0xFF), length - pos)
+                rd = i2c_msg.read(dev, chunk_len)
+                self.bus.i2c_rdwr(i2c_msg.write(dev, [off]), rd)
+                buf[pos:pos + chunk_len] = bytes(rd)
+                addr += chunk_len
+                pos += chunk_len
+        except Exception:
+            # Algunos controladores rechazan transferencias combinadas:
+            # byte a byte sobre el buffer prereservado (sin allocs por byte)
+            for i in range(length):
+                buf[i] = self.read_byte(start + i)
+        return bytes(buf)
 
 def scan(bus):
+    # Sonda con escritura vacía (mismo patrón que el ack-poll); se saltan
+    # los bloques reservados SMBus (0x00-0x07, 0x78-0x7F)
     found = []
-    for a in range(0x03, 0x78):
+    for a in range(0x08, 0x78):
         try:
-            bus.write_quick(a)
+            bus.i2c_rdwr(i2c_msg.write(a, []))
             found.append(a)
         except Exception:
             pass
@@ -93,12 +134,12 @@ def main():
         # Prueba 2: bloque en mitad de la memoria (100 bytes)
         start = eep.size // 2
         test_len = 100
-        payload = bytes([i % 256 for i in range(test_len)])
+        payload = (bytes(range(256)) * ((test_len + 255) // 256))[:test_len]
         print(f"Test 2: escribir/leer {test_len} bytes desde {hex(start)}")
-        t0 = time.time()
+        t0 = time.perf_counter_ns()
         eep.write_bytes(start, payload)
         readback = eep.read_bytes(start, test_len)
-        dt = (time.time() - t0) * 1000
+        dt = (time.perf_counter_ns() - t0) / 1e6
         print("Comparación:", "OK" if readback == payload else "mismatch", f"({dt:.1f} ms)")
 
 if __name__ == "__main__":
@@ -33,53 +33,65 @@
 #     AP2 (DO3) ↔ AP6 (DI3)
 #     AP3 (DO4) ↔ AP7 (DI4)
 
-import RPi.GPIO as GPIO, time, json, os, datetime, sys, argparse
+import time, json, os, datetime, sys, argparse
+try:
+    import gpiod
+    from gpiod.line import Bias, Direction, Value
+except ImportError:
+    print("Install the GPIO library: sudo apt-get install -y python3-libgpiod")
+    sys.exit(1)
+
+GPIOCHIP = "/dev/gpiochip0"  # 40-pin header (RPi.GPIO is deprecated on Pi 5)
 
 # APx → BCM mapping
 AP_TO_BCM = {0:5,1:6,2:19,3:26,4:24,5:16,6:20,7:21}
 DO_AP = [0,1,2,3]   # DO1..DO4
 DI_AP = [4,5,6,7]   # DI1..DI4
+# BCM numbers resolved once; avoids hashing AP_TO_BCM on every GPIO call
+DO_BCM = [AP_TO_BCM[a] for a in DO_AP]
+DI_BCM = [AP_TO_BCM[a] for a in DI_AP]
 
 REPORT_DIR="reports"
 os.makedirs(REPORT_DIR, exist_ok=True)
 ts=lambda: datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
 def setup(pulls="down"):
-    """Configure DO as outputs (LOW by default) and DI as inputs with chosen pull."""
-    GPIO.setmode(GPIO.BCM)
-    # Outputs start LOW
-    for ap in DO_AP:
-        GPIO.setup(AP_TO_BCM[ap], GPIO.OUT, initial=GPIO.LOW)
-    # Inputs with pull resistors
-    pud = GPIO.PUD_DOWN if pulls=="down" else (GPIO.PUD_UP if pulls=="up" else GPIO.PUD_OFF)
-    for ap in DI_AP:
-        GPIO.setup(AP_TO_BCM[ap], GPIO.IN, pull_up_down=pud)
+    """Request DO lines as outputs (LOW) and DI lines as inputs with chosen pull.
+
+    One libgpiod v2 request covers all 8 lines, so later bulk get_values /
+    set_values calls are single ioctls instead of one syscall per pin.
+    """
+    bias = Bias.PULL_DOWN if pulls=="down" else (Bias.PULL_UP if pulls=="up" else Bias.DISABLED)
+    config = {bcm: gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE)
+              for bcm in DO_BCM}
+    config.update({bcm: gpiod.LineSettings(direction=Direction.INPUT, bias=bias)
+                   for bcm in DI_BCM})
+    return gpiod.request_lines(GPIOCHIP, consumer="hostp12_io", config=config)
 
-def snapshot_inputs():
-    """Return dictionary with DI1..DI4 values."""
-    di = {}
-    for i, ap in enumerate(DI_AP, start=1):
-        di[f"DI{i}"]= int(GPIO.input(AP_TO_BCM[ap]))
-    return di
+def snapshot_inputs(req):
+    """Return dictionary with DI1..DI4 values (all 4 lines read in one ioctl)."""
+    vals = req.get_values(DI_BCM)
+    return {f"DI{i}": v.value for i, v in enumerate(vals, start=1)}
 
 def write_reports(di_state):
     """Write snapshot results to TXT and JSON files."""
+    tag = ts()  # one strftime per report: filenames and metadata always agree
     meta = {
-        "timestamp": ts(),
+        "timestamp": tag,
         "note":"HOST-P12 DI snapshot + DO interactive",
-        "mapping":{"DO1-4":[AP_TO_BCM[a] for a in DO_AP],"DI1-4":[AP_TO_BCM[a] for a in DI_AP]}
+        "mapping":{"DO1-4":DO_BCM,"DI1-4":DI_BCM}
     }
-    txt = [ "# HOST-P12 Input Snapshot", f"Time: {meta['timestamp']}" ]
+    txt = [ "# HOST-P12 Input Snapshot", f"Time: {tag}" ]
     txt += [ f"{k}: {v}" for k,v in di_state.items() ]
-    txt_path = os.path.join(REPORT_DIR, f"{meta['timestamp']}_hostp12_inputs.txt")
-    json_path= os.path.join(REPORT_DIR, f"{meta['timestamp']}_hostp12_inputs.json")
+    txt_path = os.path.join(REPORT_DIR, f"{tag}_hostp12_inputs.txt")
+    json_path= os.path.join(REPORT_DIR, f"{tag}_hostp12_inputs.json")
     open(txt_path,"w").write("\n".join(txt))
     open(json_path,"w").write(json.dumps({"meta":meta,"inputs":di_state}, indent=2))
     print("Snapshot saved in:")
     print(" ", txt_path)
     print(" ", json_path)
 
-def interactive_loop():
+def interactive_loop(req):
     """Interactive shell to control DO and read DI."""
     print("\nControl outputs (DO1..DO4). Commands:")
     print("  on N   -> turn ON DO N  (N=1..4)")
@@ -95,15 +107,14 @@ def interactive_loop():
         if cmd in ("q","quit","exit"):
             break
         if cmd=="read":
-            di = snapshot_inputs()
+            di = snapshot_inputs(req)
             print("DI:", di); continue
         parts = cmd.split()
         if len(parts)==2 and parts[0] in ("on","off"):
             try:
                 n = int(parts[1])
                 assert 1 <= n <= 4
-                ap = DO_AP[n-1]; bcm = AP_TO_BCM[ap]
-                GPIO.output(bcm, GPIO.HIGH if parts[0]=="on" else GPIO.LOW)
+                req.set_value(DO_BCM[n-1], Value.ACTIVE if parts[0]=="on" else Value.INACTIVE)
                 print(f"DO{n} -> {'ON' if parts[0]=='on' else 'OFF'}")
             except Exception:
                 print("Invalid channel. Use 1..4.")
@@ -115,18 +126,18 @@ def main():
     parser.add_argument("--pull", choices=["down","up","off"], default="down",
                         help="Pull setting for DI inputs (default: down)")
     args = parser.parse_args()
+    req = setup(args.pull)
     try:
-        setup(args.pull)
         # Subtest 1: snapshot inputs at startup
-        di = snapshot_inputs()
+        di = snapshot_inputs(req)
         print("# Snapshot DI1..DI4 at startup")
         for k,v in di.items():
             print(f"{k}: {v}")
         write_reports(di)
         # Subtest 2: interactive output control
-        interactive_loop()
+        interactive_loop(req)
     finally:
-        GPIO.cleanup()
+        req.release()
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# iotbase_env.py - Shared environment block for the report scripts
+
+import platform
+import socket
+import sys
+
+# Computed once at import time. platform.platform() is surprisingly slow on
+# Linux (it re-parses /etc/os-release and probes lsb_release), and every
+# report function in every script wants the same three fields — pay the cost
+# once here instead of per report.
+ENV = {
+    "host": socket.gethostname(),
+    "platform": platform.platform(),
+    "python": sys.version.split()[0],
+}
@@ -4,14 +4,17 @@
 # - Opción --bidir para probar en ambos sentidos (como el HOSTP12 MicroPython)
 # - Genera reports TXT + JSON (+ CSV opcional) en ./reports
 
-import argparse, os, time, json, csv, datetime, platform, sys
+import argparse, os, time, json, csv, datetime, itertools, sys
+from iotbase_env import ENV
 try:
-    import RPi.GPIO as GPIO
+    import gpiod
+    from gpiod.line import Bias, Direction, Value
 except ImportError:
-    print("Instala la librería GPIO: sudo apt-get install -y python3-rpi.gpio")
+    print("Instala la librería GPIO: sudo apt-get install -y python3-libgpiod")
     sys.exit(1)
 
 REPORT_DIR = "reports"
+GPIOCHIP = "/dev/gpiochip0"  # cabecera de 40 pines (RPi.GPIO está obsoleto en Pi 5)
 AP_TO_BCM = {
     # Mapeo IoTBase HOST-P12 -> GPIO BCM de la Raspberry
     0: 5,   # AP0 -> GPIO5  (pin 29)
@@ -35,30 +38,35 @@ def parse_ap_token(tok: str) -> int:
 def one_direction_test(ap_out:int, ap_in:int, cycles:int, delay:float, pull:str):
     bcm_out = AP_TO_BCM[ap_out]
     bcm_in  = AP_TO_BCM[ap_in]
-    # Config GPIO
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(bcm_out, GPIO.OUT, initial=GPIO.LOW)
-    pud = GPIO.PUD_OFF if pull=="off" else (GPIO.PUD_DOWN if pull=="down" else GPIO.PUD_UP)
-    GPIO.setup(bcm_in, GPIO.IN, pull_up_down=pud)
+    # Config GPIO (libgpiod v2: ambas líneas en una sola petición)
+    bias = Bias.DISABLED if pull=="off" else (Bias.PULL_DOWN if pull=="down" else Bias.PULL_UP)
+    req = gpiod.request_lines(
+        GPIOCHIP, consumer="gpio_pair",
+        config={
+            bcm_out: gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE),
+            bcm_in:  gpiod.LineSettings(direction=Direction.INPUT, bias=bias),
+        },
+    )
 
+    # Log compacto: tuplas (ts, dir, out_gpio, in_gpio, written, read, ok);
+    # se materializan a dicts una sola vez en write_reports
+    direction = f"AP{ap_out}->AP{ap_in}"
     log = []
     passes = 0
     fails  = 0
-    for _ in range(cycles):
-        for val in (0,1):
-            GPIO.output(bcm_out, val)
-            time.sleep(delay)
-            r = GPIO.input(bcm_in)
-            ok = (r == val)
-            log.append({
-                "dir": f"AP{ap_out}->AP{ap_in}",
-                "out_gpio": bcm_out, "in_gpio": bcm_in,
-                "written": val, "read": int(r), "ok": ok, "ts": time.time()
-            })
-            if ok: passes += 1
-            else:  fails  += 1
-    GPIO.output(bcm_out, 0)
-    GPIO.cleanup([bcm_out, bcm_in])
+    try:
+        for _ in range(cycles):
+            for val in (0,1):
+                req.set_value(bcm_out, Value(val))
+                time.sleep(delay)
+                r = req.get_value(bcm_in).value
+                ok = (r == val)
+                log.append((time.time(), direction, bcm_out, bcm_in, val, r, ok))
+                if ok: passes += 1
+                else:  fails  += 1
+        req.set_value(bcm_out, Value.INACTIVE)
+    finally:
+        req.release()
     return log, passes, fails
 
 def write_reports(prefix:str, data:dict, rows:list, write_csv:bool):
@@ -68,25 +76,27 @@ def write_reports(prefix:str, data:dict, rows:list, write_csv:bool):
     json_path = os.path.join(REPORT_DIR, f"{ts}_{prefix}.json")
     csv_path  = os.path.join(REPORT_DIR, f"{ts}_{prefix}.csv")
 
-    # TXT
-    lines = [f"# GPIO Pair Test — {data['title']}",
-             f"bidir: {data['bidir']}  |  cycles: {data['cycles']}  |  delay: {data['delay']}s  |  pull: {data['pull']}",
-             f"env: host={data['env']['host']} python={data['env']['python']}",
-             ""]
-    for r in rows:
-        lines.append(f"{r['dir']}: OUT={r['written']} -> IN={r['read']}  {'OK' if r['ok'] else 'FAIL'}")
-    lines.append("")
-    lines.append(f"summary: pass={data['pass']} fail={data['fail']}")
-
-    with open(txt_path, "w", encoding="utf-8") as f: f.write("\n".join(lines))
-    # JSON
-    with open(json_path, "w", encoding="utf-8") as f: json.dump({"meta":data, "rows":rows}, f, indent=2)
-    # CSV (opcional)
+    # TXT: un solo join sobre generador — sin lista intermedia de miles de líneas
+    header = (f"# GPIO Pair Test — {data['title']}",
+              f"bidir: {data['bidir']}  |  cycles: {data['cycles']}  |  delay: {data['delay']}s  |  pull: {data['pull']}",
+              f"env: host={data['env']['host']} python={data['env']['python']}",
+              "")
+    fmt = "{d}: OUT={w} -> IN={r}  {s}".format
+    body = (fmt(d=r[1], w=r[4], r=r[5], s="OK" if r[6] else "FAIL") for r in rows)
+    footer = ("", f"summary: pass={data['pass']} fail={data['fail']}")
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(itertools.chain(header, body, footer)))
+    # JSON (las tuplas se materializan a dicts solo aquí; compacto — lo lee una máquina)
+    fields = ("ts","dir","out_gpio","in_gpio","written","read","ok")
+    row_dicts = [dict(zip(fields, r)) for r in rows]
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"meta":data, "rows":row_dicts}, f, separators=(",", ":"))
+    # CSV (opcional): writerows procesa el lote entero en una llamada C
     if write_csv:
         with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=["ts","dir","out_gpio","in_gpio","written","read","ok"])
-            w.writeheader()
-            for r in rows: w.writerow(r)
+            w = csv.writer(f)
+            w.writerow(fields)
+            w.writerows(rows)
     return txt_path, json_path, (csv_path if write_csv else None)
 
 def main():
@@ -118,7 +128,7 @@ def main():
         "title": f"AP{ap_out} -> AP{ap_in}" + (" + reverse" if args.bidir else ""),
         "bidir": args.bidir, "cycles": args.cycles, "delay": args.delay, "pull": args.pull,
         "mapping": {"AP->BCM": AP_TO_BCM},
-        "env": {"host": platform.node(), "python": sys.version.split()[0]},
+        "env": {"host": ENV["host"], "python": ENV["python"]},  # cacheado en import
         "pass": total_pass, "fail": total_fail
     }
     t,j,c = write_reports("gpio_pair", meta, all_rows, args.csv)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-import RPi.GPIO as GPIO, time, json, os, datetime, platform, sys
+import RPi.GPIO as GPIO, time, json, mmap, os, datetime, struct
+from iotbase_env import ENV
 REPORT_DIR="reports"; os.makedirs(REPORT_DIR, exist_ok=True)
 def ts(): return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -10,28 +11,53 @@ ap.add_argument("--out", type=int, default=5)  # GPIO5 = AP0
 ap.add_argument("--inp", type=int, default=6)  # GPIO6 = AP1
 args=ap.parse_args()
 
+# RPi.GPIO solo configura el pinmux; el camino caliente va directo a los
+# registros BCM mapeados desde /dev/gpiomem (sin syscall por toggle)
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(args.out, GPIO.OUT, initial=GPIO.LOW)
 GPIO.setup(args.inp, GPIO.IN)
 
+GPSET0=0x1C; GPCLR0=0x28; GPLEV0=0x34  # offsets de registro (pines 0..31)
+_fd = os.open("/dev/gpiomem", os.O_RDWR | os.O_SYNC)
+_mem = mmap.mmap(_fd, 4096)
+os.close(_fd)
+
+def gpio_write(pin, val):
+    struct.pack_into("<I", _mem, GPSET0 if val else GPCLR0, 1 << pin)
+
+def gpio_read(pin):
+    return (struct.unpack_from("<I", _mem, GPLEV0)[0] >> pin) & 1
+
+# Patrón pseudoaleatorio en vez de 0101: más cobertura con menos espera.
+# El settle eléctrico del GPIO es <1 µs; 1 ms de margen sobra (antes 200 ms).
+PATTERN = [0,1,0,1,1,0,1,0,0,1]
+SETTLE_NS = 1_000_000
 log=[]; wrote=[]; read=[]
-for s in [0,1,0,1]:
-    GPIO.output(args.out, s)
-    time.sleep(0.2)
-    r = GPIO.input(args.inp)
+for s in PATTERN:
+    gpio_write(args.out, s)
+    t = time.monotonic_ns()
+    while time.monotonic_ns() - t < SETTLE_NS:
+        pass
+    r = gpio_read(args.inp)
     log.append(f"OUT(GPIO{args.out})={s} -> IN(GPIO{args.inp})={r}")
     wrote.append(s); read.append(r)
+_mem.close()
 GPIO.cleanup()
 
 ok = (wrote==read)
+tag = ts()  # una sola marca de tiempo: TXT y JSON siempre emparejados
 txt = "# HOST-P12 GPIO Loopback\n" + "\n".join(log) + f"\n\nLoopback OK: {ok}\n"
 data = {
-  "timestamp": ts(),
+  "timestamp": tag,
   "out_gpio": args.out, "in_gpio": args.inp,
   "log": log, "loopback_ok": ok,
-  "env": {"host": platform.node(), "python": sys.version.split()[0]}
+  "env": {"host": ENV["host"], "python": ENV["python"]}  # cacheado en import
 }
-tpath=f"{REPORT_DIR}/{ts()}_gpio_report.txt"
-jpath=f"{REPORT_DIR}/{ts()}_gpio_report.json"
-open(tpath,"w").write(txt); open(jpath,"w").write(json.dumps(data,indent=2))
+tpath=f"{REPORT_DIR}/{tag}_gpio_report.txt"
+jpath=f"{REPORT_DIR}/{tag}_gpio_report.json"
+# with + flush: sin descriptores colgando hasta el GC ni buffers perdidos si algo falla
+with open(tpath,"w") as f:
+    f.write(txt); f.flush()
+with open(jpath,"w") as f:
+    json.dump(data, f, indent=2); f.flush()
 print(f"TXT report: {tpath}\nJSON report: {jpath}")
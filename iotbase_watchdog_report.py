@@ -7,7 +7,10 @@
 #
 # Designed to mirror the logic of the MicroPython example (run/LED/timeout). :contentReference[oaicite:2]{index=2}
 
-import os, sys, time, json, fcntl, struct, platform, subprocess, datetime
+import os, time, json, fcntl, functools, struct, subprocess, datetime
+from collections import deque
+from contextlib import contextmanager
+from iotbase_env import ENV
 
 # ---------- Linux watchdog ioctl constants (from linux/watchdog.h) ----------
 WDIOC_GETSUPPORT    = 0x80285700
@@ -26,38 +29,42 @@ WDIOF_CARDRESET     = 0x0020  # if set in bootstatus, last reboot was watchdog
 REPORT_DIR = "reports"
 MARKER_PATH = "/var/tmp/iotbase_wdt_marker.json"  # survives reboot
 
+# Precompiled u32 codec shared by all ioctl helpers (no per-call format parse)
+_U32 = struct.Struct("I")
+_ZERO = _U32.pack(0)
+
 def now_tag():
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
-def sh(cmd):
-    try:
-        return subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT).strip()
-    except Exception as e:
-        return f"ERROR: {e}"
+# Shell script run once by env_block: every probe in a single fork/exec,
+# with @@...@@ markers delimiting the sections for parsing
+_ENV_PROBE = (
+    "echo @@UNAME@@; uname -a; "
+    "echo @@DMESG@@; dmesg | tail -n 30; "
+    "echo @@LSMOD@@; lsmod | grep -i wdt || true"
+)
 
 def open_watchdog():
     return os.open("/dev/watchdog", os.O_RDWR)
 
 def wd_get_timeout(fd):
-    buf = fcntl.ioctl(fd, WDIOC_GETTIMEOUT, struct.pack("I", 0))
-    (tout,) = struct.unpack("I", buf)
-    return tout
+    return _U32.unpack(fcntl.ioctl(fd, WDIOC_GETTIMEOUT, _ZERO))[0]
 
 def wd_set_timeout(fd, seconds):
     # SETTIMEOUT expects an int; returns the actual timeout (driver may round)
-    buf = struct.pack("I", int(seconds))
-    out = fcntl.ioctl(fd, WDIOC_SETTIMEOUT, buf)
-    (actual,) = struct.unpack("I", out)
-    return actual
+    return _U32.unpack(fcntl.ioctl(fd, WDIOC_SETTIMEOUT, _U32.pack(int(seconds))))[0]
 
 def wd_get_bootstatus(fd):
-    buf = fcntl.ioctl(fd, WDIOC_GETBOOTSTATUS, struct.pack("I", 0))
-    (st,) = struct.unpack("I", buf)
-    return st
+    return _U32.unpack(fcntl.ioctl(fd, WDIOC_GETBOOTSTATUS, _ZERO))[0]
 
 def wd_keepalive(fd):
-    # Either ioctl KEEPALIVE or write any byte; we’ll use ioctl:
-    fcntl.ioctl(fd, WDIOC_KEEPALIVE)
+    # Any write to /dev/watchdog counts as a ping and skips the ioctl
+    # marshalling path; fall back to WDIOC_KEEPALIVE if a driver rejects
+    # writes. NB: never write 'V' here — that arms the magic close.
+    try:
+        os.write(fd, b"\x00")
+    except OSError:
+        fcntl.ioctl(fd, WDIOC_KEEPALIVE)
 
 def wd_magic_close(fd, has_magic_close=True):
     # Many drivers honor the "magic close" (write 'V') to disarm on close
@@ -68,62 +75,110 @@ def wd_magic_close(fd, has_magic_close=True):
             pass
     os.close(fd)
 
+@contextmanager
+def watchdog():
+    """
+    Open /dev/watchdog and guarantee the magic 'V' close on any exit path.
+    Without this, an exception between open and close leaves the timer
+    armed and reboots the box unintentionally.
+    """
+    fd = open_watchdog()
+    try:
+        yield fd
+    finally:
+        wd_magic_close(fd, has_magic_close=True)
+
+@functools.lru_cache(maxsize=1)
 def env_block():
+    # Memoized, and all external probes ride one sh -c invocation — a fork
+    # is millisecond-class on a Pi, so pay it once instead of three times.
+    try:
+        out = subprocess.run(["sh", "-c", _ENV_PROBE], capture_output=True, text=True).stdout
+    except Exception as e:
+        out = f"@@UNAME@@\nERROR: {e}"
+    sections = {}
+    key = None
+    for line in out.splitlines():
+        if line.startswith("@@") and line.endswith("@@"):
+            key = line.strip("@").lower()
+            sections[key] = []
+        elif key is not None:
+            sections[key].append(line)
+    sec = lambda k: "\n".join(sections.get(k, [])).strip()
     return {
-        "host": platform.node(),
-        "platform": platform.platform(),
-        "python": sys.version.split()[0],
-        "uname": sh("uname -a"),
-        "dmesg_tail": sh("dmesg | tail -n 30"),
-        "lsmod_watchdog": sh("lsmod | grep -i wdt || true"),
+        **ENV,  # host/platform/python cached at import in iotbase_env
+        "uname": sec("uname"),
+        "dmesg_tail": sec("dmesg"),
+        "lsmod_watchdog": sec("lsmod"),
     }
 
-def write_report(prefix, txt, json_obj):
+def write_report(prefix, txt, json_obj, pretty=False):
     os.makedirs(REPORT_DIR, exist_ok=True)
     ts = now_tag()
     txt_path = os.path.join(REPORT_DIR, f"{ts}_{prefix}.txt")
     json_path = os.path.join(REPORT_DIR, f"{ts}_{prefix}.json")
+    # fsync both files: these tests deliberately reboot the box, and a
+    # report sitting in the page cache would silently vanish
     with open(txt_path, "w", encoding="utf-8") as f:
         f.write(txt)
+        f.flush()
+        os.fsync(f.fileno())
     with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(json_obj, f, indent=2)
+        # Compact by default: the JSON is machine-read and fsync'd, so
+        # indentation just means more dirty pages on the SD card
+        if pretty:
+            json.dump(json_obj, f, indent=2)
+        else:
+            json.dump(json_obj, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
     return txt_path, json_path
 
 def feed_only(timeout=5, run_seconds=180, feed_period=0.5):
-    log = []
+    # Only the last 10 messages ever make the report; a bounded deque keeps
+    # memory O(1) instead of retaining every feed line of a long run
+    log = deque(maxlen=10)
     res = {"mode":"feed-only","timeout_req":timeout,"run_seconds":run_seconds,"feed_period":feed_period}
     try:
-        fd = open_watchdog()
+        with watchdog() as fd:
+            # Capabilities / bootstatus before starting
+            bootstatus = wd_get_bootstatus(fd)
+            # Set timeout
+            actual = wd_set_timeout(fd, timeout)
+            res["timeout_set"] = actual
+            log.append(f"Program started | /dev/watchdog opened | timeout set={actual}s")
+            # “LED” virtual state (to mirror MicroPython) :contentReference[oaicite:3]{index=3}
+            led = 0
+            # monotonic: an NTP step must not cut the feed window short (or stretch it).
+            # Deadline-based cadence: sleeping until t0 + n*feed_period keeps feeds on
+            # a fixed grid instead of drifting by the per-iteration work time.
+            t0 = time.monotonic()
+            deadline = t0 + run_seconds
+            next_t = t0
+            while time.monotonic() < deadline:
+                # Keepalive first and sleep right after it — logging/formatting
+                # must never sit between a feed and the next one, or an I/O stall
+                # there could push the gap past the watchdog timeout
+                wd_keepalive(fd)
+                next_t += feed_period
+                time.sleep(max(0.0, next_t - time.monotonic()))
+                led = 1 - led
+                elapsed = time.monotonic() - t0
+                log.append(f"Running… LED:{led} elapsed:{elapsed:.1f}s fed")
     except FileNotFoundError:
         raise SystemExit("No /dev/watchdog — enable with dtparam=watchdog=on and reboot.")
-    # Capabilities / bootstatus before starting
-    bootstatus = wd_get_bootstatus(fd)
-    has_magic_close = True  # assume it; note capability check below
-    # Set timeout
-    actual = wd_set_timeout(fd, timeout)
-    res["timeout_set"] = actual
-    log.append(f"Program started | /dev/watchdog opened | timeout set={actual}s")
-    # “LED” virtual state (to mirror MicroPython) :contentReference[oaicite:3]{index=3}
-    led = 0
-    t0 = time.time()
-    while time.time() - t0 < run_seconds:
-        wd_keepalive(fd)
-        led = 1 - led
-        elapsed = time.time() - t0
-        msg = f"Running… LED:{led} elapsed:{elapsed:.1f}s fed"
-        log.append(msg)
-        time.sleep(feed_period)
-    # clean close: try magic close
-    # We can infer magic_close support from bootstatus capabilities if needed, but not all drivers expose it.
-    wd_magic_close(fd, has_magic_close=True)
     log.append("Graceful close with magic 'V' — no reboot expected.")
     res["bootstatus_before"] = bootstatus
-    res["log_tail"] = log[-10:]
+    res["log_tail"] = list(log)
     # Build report text
     txt = []
     txt.append("# Watchdog Feed-Only Test (non-destructive)")
     txt.append(f"timeout_set: {actual}s | run_seconds: {run_seconds} | feed_period: {feed_period}s")
-    txt.append(f"bootstatus_before: 0x{bootstatus:08x} (WDIOF_CARDRESET={'yes' if (bootstatus & WDIOF_CARDRESET) else 'no'})")
+    # Compute once, format once: the bit test and hex render don't belong
+    # inside the f-string
+    cr = "yes" if bootstatus & WDIOF_CARDRESET else "no"
+    bs_hex = f"0x{bootstatus:08x}"
+    txt.append(f"bootstatus_before: {bs_hex} (WDIOF_CARDRESET={cr})")
     txt.extend(log)
     env = env_block()
     res["env"] = env
@@ -137,36 +192,47 @@ def trigger_reboot(timeout=5, run_seconds=10, feed_period=0.5):
     Feed for a short period and then DELIBERATELY stop feeding to trigger reboot.
     Writes a persistent marker file so we can confirm after reboot with post-check.
     """
-    log = []
+    log = deque(maxlen=10)
     res = {"mode":"trigger-reboot","timeout_req":timeout,"run_seconds":run_seconds,"feed_period":feed_period}
     try:
-        fd = open_watchdog()
+        with watchdog() as fd:
+            bootstatus = wd_get_bootstatus(fd)
+            actual = wd_set_timeout(fd, timeout)
+            res["timeout_set"] = actual
+            t0 = time.monotonic()
+            log.append(f"Program started | feeding for {run_seconds}s, then STOP to force reboot | timeout={actual}s")
+            # Same ordering and drift-free cadence as feed_only
+            deadline = t0 + run_seconds
+            next_t = t0
+            while time.monotonic() < deadline:
+                wd_keepalive(fd)
+                next_t += feed_period
+                time.sleep(max(0.0, next_t - time.monotonic()))
+                elapsed = time.monotonic() - t0
+                log.append(f"Feeding… elapsed:{elapsed:.1f}s")
+            # Record a marker so we can verify after reboot
+            marker = {"ts": now_tag(), "expected_reboot_due_to_watchdog": True, "timeout_set": actual}
+            try:
+                with open(MARKER_PATH, "w") as f:
+                    json.dump(marker, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # fsync the directory too so the new entry survives the reboot
+                dfd = os.open(os.path.dirname(MARKER_PATH), os.O_RDONLY)
+                os.fsync(dfd)
+                os.close(dfd)
+            except Exception as e:
+                log.append(f"WARNING: could not write marker: {e}")
+            # The magic close only happens when the with-block exits; we stay
+            # inside it on purpose — keeping the fd open and simply stopping
+            # the feed is the safest way to guarantee the reboot, while an
+            # unexpected exception still disarms cleanly via the manager.
+            log.append("Stopping feed now. System should reboot within the timeout window.")
+            # Busy-wait until the reboot happens (this process will be killed by reboot)
+            while True:
+                time.sleep(1)
     except FileNotFoundError:
         raise SystemExit("No /dev/watchdog — enable with dtparam=watchdog=on and reboot.")
-    bootstatus = wd_get_bootstatus(fd)
-    actual = wd_set_timeout(fd, timeout)
-    res["timeout_set"] = actual
-    t0 = time.time()
-    log.append(f"Program started | feeding for {run_seconds}s, then STOP to force reboot | timeout={actual}s")
-    while time.time() - t0 < run_seconds:
-        wd_keepalive(fd)
-        elapsed = time.time() - t0
-        log.append(f"Feeding… elapsed:{elapsed:.1f}s")
-        time.sleep(feed_period)
-    # Record a marker so we can verify after reboot
-    marker = {"ts": now_tag(), "expected_reboot_due_to_watchdog": True, "timeout_set": actual}
-    try:
-        with open(MARKER_PATH, "w") as f:
-            json.dump(marker, f)
-    except Exception as e:
-        log.append(f"WARNING: could not write marker: {e}")
-    # DO NOT magic-close; either just close or keep fd open and stop feeding.
-    # Closing without magic may trigger reboot immediately on some drivers;
-    # the safest to ensure reboot is to keep it open and simply stop feeding.
-    log.append("Stopping feed now. System should reboot within the timeout window.")
-    # Busy-wait until the reboot happens (this process will be killed by reboot)
-    while True:
-        time.sleep(1)
 
 def post_check():
     """
@@ -182,20 +248,20 @@ def post_check():
         except Exception:
             marker = {"error":"failed to read marker"}
     res["marker"] = marker
-    # Open /dev/watchdog just to query bootstatus (and close gracefully)
+    # Open /dev/watchdog just to query bootstatus (context manager disarms
+    # cleanly on exit, so closing this check cannot cause a reboot)
     try:
-        fd = open_watchdog()
-        bootstatus = wd_get_bootstatus(fd)
-        # Disarm cleanly to avoid unwanted reboot when closing this check
-        wd_magic_close(fd, has_magic_close=True)
+        with watchdog() as fd:
+            bootstatus = wd_get_bootstatus(fd)
     except Exception as e:
         bootstatus = None
         res["error"] = str(e)
     res["bootstatus"] = bootstatus
     txt = []
     txt.append("# Watchdog Post-Check")
-    txt.append(f"bootstatus: {('0x%08x'%bootstatus) if bootstatus is not None else 'N/A'} "
-               f"(WDIOF_CARDRESET={'yes' if (bootstatus and (bootstatus & WDIOF_CARDRESET)) else 'no'})")
+    cr = "yes" if (bootstatus and bootstatus & WDIOF_CARDRESET) else "no"
+    bs_hex = f"0x{bootstatus:08x}" if bootstatus is not None else "N/A"
+    txt.append(f"bootstatus: {bs_hex} (WDIOF_CARDRESET={cr})")
     txt.append(f"marker: {json.dumps(marker) if marker else 'None'}")
     env = env_block()
     res["env"] = env
@@ -211,22 +277,23 @@ def main():
     ap.add_argument("--timeout", type=int, default=5, help="Watchdog timeout seconds")
     ap.add_argument("--run-seconds", type=int, default=180, help="Duration to keep feeding (MicroPython used 180s)")
     ap.add_argument("--period", type=float, default=0.5, help="Feed period seconds")
+    ap.add_argument("--pretty", action="store_true", help="Indent JSON reports (default: compact)")
     args = ap.parse_args()
 
     prefix = "wdt_report"
     if args.mode == "feed-only":
         txt, js = feed_only(timeout=args.timeout, run_seconds=args.run_seconds, feed_period=args.period)
-        txt_path, json_path = write_report(prefix, txt, js)
+        txt_path, json_path = write_report(prefix, txt, js, pretty=args.pretty)
         print(f"Report TXT: {txt_path}\nReport JSON: {json_path}")
     elif args.mode == "trigger-reboot":
         # This will not return (system should reboot). We still write a TXT/JSON “pre” log.
         txt, js = "# Trigger-reboot starting… see marker after reboot", {"note":"pre-trigger log"}
-        pre_txt, pre_json = write_report("wdt_pretrigger", txt, js)
+        pre_txt, pre_json = write_report("wdt_pretrigger", txt, js, pretty=args.pretty)
         print(f"Pre-trigger logs written:\n  {pre_txt}\n  {pre_json}\nTriggering reboot shortly…")
         trigger_reboot(timeout=args.timeout, run_seconds=min(args.run_seconds, 15), feed_period=args.period)
     else:  # post-check
         txt, js = post_check()
-        txt_path, json_path = write_report("wdt_postcheck", txt, js)
+        txt_path, json_path = write_report("wdt_postcheck", txt, js, pretty=args.pretty)
         print(f"Post-check TXT: {txt_path}\nPost-check JSON: {json_path}")
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 import serial, time
-ser = serial.Serial("/dev/serial0", 115200, timeout=0.5)
+from iotbase_rs485_echo_test import ping
+# timeout corto + read_frame por epoll (dentro de ping): vuelve en cuanto
+# llega el '\n' del eco, sin pagar el timeout completo; el sleep(1) fija la cadencia
+ser = serial.Serial("/dev/serial0", 115200, timeout=0.05)
 while True:
-    ser.write(b"PING\n")
-    rx = ser.read(5)
-    print("RX:", rx)
+    print("RX:", ping(ser))
     time.sleep(1)